@@ -0,0 +1,186 @@
+"""Helpers shared by the DVB-S2 transmitter and receiver scripts"""
+import os
+import time
+import types
+import json
+from gnuradio import dtv
+import SoapySDR
+
+
+# Map modcod string to GNU Radio constants
+MODCOD_MAP = types.MappingProxyType({
+    'QPSK1/2': (dtv.MOD_QPSK, dtv.C1_2),
+    'QPSK3/4': (dtv.MOD_QPSK, dtv.C3_4),
+    '8PSK2/3': (dtv.MOD_8PSK, dtv.C2_3),
+    '8PSK5/6': (dtv.MOD_8PSK, dtv.C5_6)
+})
+
+# Seven 188-byte MPEG-TS packets per sent datagram so packets are never split
+TS_PAYLOAD_SIZE = 7 * 188
+
+# FECFRAME_NORMAL length in bits; the FEC chain carries one bit per byte item
+FECFRAME_BITS = 64800
+
+# (Kbch, Nbch) for FECFRAME_NORMAL, ETSI EN 302 307 Table 5a
+BCH_SIZES = types.MappingProxyType({
+    dtv.C1_2: (32208, 32400),
+    dtv.C2_3: (43040, 43200),
+    dtv.C3_4: (48408, 48600),
+    dtv.C5_6: (53840, 54000)
+})
+
+BITS_PER_SYMBOL = types.MappingProxyType({
+    dtv.MOD_QPSK: 2,
+    dtv.MOD_8PSK: 3
+})
+
+BBHEADER_BITS = 80
+SLOT_SYMBOLS = 90
+PILOT_BLOCK_SYMBOLS = 36
+
+# Enumeration results are cached per boot session so restarts skip the probe
+SDR_CACHE_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}"),
+                              "dvbs2-sdr-cache.json")
+SDR_CACHE_TTL = 60
+# Only USB hotplug invalidates the cache early; network devices (Ethernet
+# uhd, ip: Pluto) are not tracked and may be served stale for up to the TTL
+SDR_DEVICE_PATH = "/dev/bus/usb"
+
+# Realtime priority for flowgraph threads running on isolated cores
+SCHED_FIFO_PRIORITY = 50
+
+
+def isolated_cpus():
+    """CPU cores reserved with the isolcpus= kernel parameter, if any"""
+    try:
+        with open("/proc/cmdline") as f:
+            params = f.read().split()
+    except OSError:
+        return []
+
+    cores = set()
+    for param in params:
+        if not param.startswith("isolcpus="):
+            continue
+        # Flags such as "domain" or "managed_irq" may precede the CPU list
+        for part in param[len("isolcpus="):].split(","):
+            # cpulist entries are "first[-last][:used/group]"
+            span, _, stride = part.partition(":")
+            first, _, last = span.partition("-")
+            try:
+                first = int(first)
+                last = int(last) if last else first
+                used, group = map(int, stride.split("/")) if stride else (1, 1)
+                cores.update(core for core in range(first, last + 1)
+                             if (core - first) % group < used)
+            except (ValueError, ZeroDivisionError):
+                continue
+    return sorted(cores)
+
+
+ISOLATED_CPUS = isolated_cpus()
+
+
+def worker_cores():
+    """CPU cores for flowgraph blocks: isolated cores if any, else all but 0/1"""
+    if ISOLATED_CPUS:
+        return ISOLATED_CPUS
+    cores = sorted(os.sched_getaffinity(0))
+    return [core for core in cores if core >= 2] or cores
+
+
+def ts_bytes_per_frame(code_rate):
+    """MPEG-TS bytes carried in the data field of one BBFRAME"""
+    kbch, _ = BCH_SIZES[code_rate]
+    return (kbch - BBHEADER_BITS) // 8
+
+
+def fecframe_symbols(constellation):
+    """Modulated symbols in one FECFRAME_NORMAL"""
+    return FECFRAME_BITS // BITS_PER_SYMBOL[constellation]
+
+
+def plframe_symbols(constellation, pilots):
+    """Symbols in one PLFRAME: PLHEADER slot, data slots and pilot blocks"""
+    slots = fecframe_symbols(constellation) // SLOT_SYMBOLS
+    symbols = SLOT_SYMBOLS * (slots + 1)
+    if pilots:
+        symbols += PILOT_BLOCK_SYMBOLS * ((slots - 1) // 16)
+    return symbols
+
+
+def set_buffer_size(block, frame_items):
+    """Cap a block's output buffer at two frames of `frame_items` items
+
+    Two frames keep the producer and consumer double-buffered. GNU Radio
+    ignores the min hint once a max is set, so only the max is applied.
+    """
+    block.set_max_output_buffer(2 * frame_items)
+
+
+def start_flowgraph(tb):
+    """Start the flowgraph, then give threads pinned to isolated cores SCHED_FIFO"""
+    tb.start()
+    if not ISOLATED_CPUS:
+        return
+
+    # Block threads have bound their affinity by the time start() returns;
+    # driver threads spawned along the way stay unpinned and keep their policy
+    isolated = set(ISOLATED_CPUS)
+    for tid in map(int, os.listdir("/proc/self/task")):
+        try:
+            if not os.sched_getaffinity(tid) <= isolated:
+                continue
+            os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(SCHED_FIFO_PRIORITY))
+        except PermissionError:
+            print("SCHED_FIFO not permitted; add an rtprio limit in /etc/security/limits.conf")
+            return
+        except OSError:
+            # The thread exited while walking the list
+            continue
+
+
+def _device_mtime():
+    """Latest mtime of the per-bus USB directories, which change on hotplug
+
+    Returns None when the USB device tree cannot be read, in which case
+    hotplug cannot be detected and the cache is not used.
+    """
+    try:
+        with os.scandir(SDR_DEVICE_PATH) as buses:
+            return max((bus.stat().st_mtime for bus in buses if bus.is_dir()), default=None)
+    except OSError:
+        return None
+
+
+def enumerate_sdrs():
+    """Enumerate SoapySDR devices, reusing a short-lived on-disk cache"""
+    mtime = _device_mtime()
+    if mtime is not None:
+        try:
+            with open(SDR_CACHE_PATH) as f:
+                cache = json.load(f)
+            if time.time() - cache['time'] < SDR_CACHE_TTL and cache['mtime'] == mtime:
+                return cache['devices']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    # SoapySDR already runs every module's find function concurrently
+    devices = [dict(device) for device in SoapySDR.Device.enumerate()]
+
+    if devices and mtime is not None:
+        try:
+            with open(SDR_CACHE_PATH, 'w') as f:
+                json.dump({'time': time.time(), 'mtime': mtime, 'devices': devices}, f)
+        except OSError:
+            pass
+
+    return devices
+
+
+def configure_sdr(sdr, freq, rate, gain, bw):
+    """Apply sample rate, frequency, gain and bandwidth to an osmosdr source/sink"""
+    sdr.set_sample_rate(rate)
+    sdr.set_center_freq(freq)
+    sdr.set_gain(gain)
+    sdr.set_bandwidth(bw)
@@ -1,13 +1,25 @@
 import os
 import sys
 import time
+import itertools
 import signal
+import threading
 import argparse
 import numpy as np
 import subprocess
+import shlex
 from gnuradio import gr, blocks, dtv
 import osmosdr
-import SoapySDR
+from dvbs2_common import (
+    MODCOD_MAP,
+    TS_PAYLOAD_SIZE,
+    ts_bytes_per_frame,
+    set_buffer_size,
+    worker_cores,
+    start_flowgraph,
+    enumerate_sdrs,
+    configure_sdr
+)
 
 
 def parse_args():
@@ -20,7 +32,7 @@ def parse_args():
                         help="Sample rate in Hz (e.g., 2e6 for 2 MHz)")
     parser.add_argument("--gain", type=float, default=40,
                         help="SDR gain in dB (0-70)")
-    parser.add_argument("--modcod", choices=['QPSK1/2', 'QPSK3/4', '8PSK2/3', '8PSK5/6'],
+    parser.add_argument("--modcod", choices=list(MODCOD_MAP),
                         default='QPSK1/2', help="Modulation and coding scheme")
     parser.add_argument("--rolloff", type=float, choices=[0.2, 0.25, 0.35],
                         default=0.35, help="Roll-off factor")
@@ -29,7 +41,10 @@ def parse_args():
     parser.add_argument("--debug", action="store_true",
                         help="Enable debug output and logging")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    args.constellation, args.code_rate = MODCOD_MAP[args.modcod]
+
+    return args
 
 
 class DVBS2Receiver(gr.top_block):
@@ -38,15 +53,9 @@ class DVBS2Receiver(gr.top_block):
 
         self.args = args
 
-        # Map modulation and coding scheme to GNU Radio constants
-        self.modcod_map = {
-            'QPSK1/2': (dtv.MOD_QPSK, dtv.C1_2),
-            'QPSK3/4': (dtv.MOD_QPSK, dtv.C3_4),
-            '8PSK2/3': (dtv.MOD_8PSK, dtv.C2_3),
-            '8PSK5/6': (dtv.MOD_8PSK, dtv.C5_6)
-        }
-
-        self.constellation, self.code_rate = self.modcod_map[args.modcod]
+        # Modulation and coding resolved once in parse_args()
+        self.constellation = args.constellation
+        self.code_rate = args.code_rate
 
         # Setup GNU Radio blocks
         self.setup_blocks()
@@ -58,10 +67,8 @@ class DVBS2Receiver(gr.top_block):
             # SDR Source Block
             sdr_args = detect_sdr()
             self.sdr_source = osmosdr.source(args=sdr_args)
-            self.sdr_source.set_sample_rate(self.args.rate)
-            self.sdr_source.set_center_freq(self.args.freq)
-            self.sdr_source.set_gain(self.args.gain)
-            self.sdr_source.set_bandwidth(self.args.rate)
+            configure_sdr(self.sdr_source, self.args.freq, self.args.rate,
+                          self.args.gain, self.args.rate)
 
             # DVB-S2 Demodulator
             self.demodulator = dtv.dvbs2_demodulator(
@@ -77,7 +84,7 @@ class DVBS2Receiver(gr.top_block):
                 itemsize=gr.sizeof_char,
                 ipaddr="127.0.0.1",
                 port=self.args.port,
-                payload_size=1472
+                payload_size=TS_PAYLOAD_SIZE
             )
 
             if self.args.debug:
@@ -96,15 +103,26 @@ class DVBS2Receiver(gr.top_block):
         """Connect SDR source to demodulator and UDP output"""
         try:
             self.connect(self.sdr_source, self.demodulator, self.ts_sink)
+            self.tune_scheduler()
         except Exception as e:
             print(f"Error connecting blocks: {e}")
             sys.exit(1)
 
+    def tune_scheduler(self):
+        """Cap the TS output at two BBFRAMEs and pin each block to its own core"""
+        ts_bytes = ts_bytes_per_frame(self.code_rate)
+        set_buffer_size(self.demodulator, ts_bytes)
+        self.demodulator.set_max_noutput_items(ts_bytes)
+
+        cores = itertools.cycle(worker_cores())
+        for block in (self.sdr_source, self.demodulator, self.ts_sink):
+            block.set_processor_affinity([next(cores)])
+
 
 def detect_sdr():
     """Detect and configure SDR automatically"""
     try:
-        devices = SoapySDR.Device.enumerate()
+        devices = enumerate_sdrs()
         if not devices:
             print("No SDR devices found!")
             sys.exit(1)
@@ -132,11 +150,11 @@ def detect_sdr():
 
 def start_vlc(port):
     """Start VLC to play the received MPEG-TS stream"""
-    vlc_command = f"cvlc udp://@: {port} --network-caching=100"
+    vlc_command = f"cvlc udp://@:{port} --network-caching=100"
 
     try:
-        process = subprocess.Popen(vlc_command, shell=True,
-                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        process = subprocess.Popen(shlex.split(vlc_command), stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL, close_fds=True)
         return process
     except Exception as e:
         print(f"Error starting VLC: {e}")
@@ -144,28 +162,30 @@ def start_vlc(port):
 
 
 if __name__ == "__main__":
-    signal.signal(signal.SIGINT, lambda sig, frame: sys.exit(0))
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda sig, frame: stop_event.set())
 
     # Parse CLI arguments
     args = parse_args()
 
     print(f"Starting DVB-S2 Receiver...")
 
+    vlc_process = None
     try:
         # Start VLC for playback
         vlc_process = start_vlc(args.port)
 
         # Create and start the receiver
         tb = DVBS2Receiver(args)
-        tb.start()
+        start_flowgraph(tb)
 
         print("Receiving and decoding DVB-S2 signal. Press Ctrl+C to stop.")
-        signal.pause()  # Keep script running until Ctrl+C
+        stop_event.wait()  # Keep script running until Ctrl+C
 
     except Exception as e:
         print(f"Error during reception: {e}")
     finally:
-        if 'vlc_process' in globals():
+        if vlc_process:
             vlc_process.terminate()
         if 'tb' in globals():
             tb.stop()
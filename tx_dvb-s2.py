@@ -1,17 +1,42 @@
 import os
 import sys
 import time
+import itertools
+import types
 import signal
 import argparse
 import numpy as np
 import subprocess
+import shlex
 from gnuradio import gr, blocks, dtv
 import osmosdr
-import SoapySDR
+from dvbs2_common import (
+    MODCOD_MAP,
+    FECFRAME_BITS,
+    BCH_SIZES,
+    ts_bytes_per_frame,
+    fecframe_symbols,
+    plframe_symbols,
+    set_buffer_size,
+    worker_cores,
+    start_flowgraph,
+    enumerate_sdrs,
+    configure_sdr
+)
+
+
+MODULATOR_INTERPOLATION = 2
+
+# Map rolloff to GNU Radio constants
+ROLLOFF_MAP = types.MappingProxyType({
+    0.20: dtv.RO_0_20,
+    0.25: dtv.RO_0_25,
+    0.35: dtv.RO_0_35
+})
 
 
 def detect_sdr():
-    sdr_list = SoapySDR.Device.enumerate()
+    sdr_list = enumerate_sdrs()
     if not sdr_list:
         raise RuntimeError("No SDR devices found!")
     return sdr_list[0]['driver']
@@ -32,11 +57,11 @@ def parse_args():
                         help="SDR gain in dB (0-70)")
 
     # DVB-S2 Parameters
-    parser.add_argument("--modcod", choices=['QPSK1/2', 'QPSK3/4', '8PSK2/3', '8PSK5/6'],
+    parser.add_argument("--modcod", choices=list(MODCOD_MAP),
                         default='QPSK1/2', help="Modulation and coding scheme")
     parser.add_argument("--pilots", action="store_true", default=True,
                         help="Enable pilot symbols")
-    parser.add_argument("--rolloff", type=float, choices=[0.2, 0.25, 0.35],
+    parser.add_argument("--rolloff", type=float, choices=list(ROLLOFF_MAP),
                         default=0.35, help="Roll-off factor")
 
 
@@ -60,9 +85,69 @@ def parse_args():
     if not 0 <= args.gain <= 70:
         parser.error("Gain must be between 0 and 70 dB")
 
+    args.constellation, args.code_rate = MODCOD_MAP[args.modcod]
+
     return args
 
 
+class DVBS2Encoder(gr.hier_block2):
+    """BBHEADER -> BB scrambler -> BCH -> LDPC encoder chain as one block"""
+    def __init__(self, code_rate, constellation, rolloff):
+        gr.hier_block2.__init__(
+            self, "DVB-S2 Encoder",
+            gr.io_signature(1, 1, gr.sizeof_char),
+            gr.io_signature(1, 1, gr.sizeof_char)
+        )
+
+        self.code_rate = code_rate
+
+        self.bbheader = dtv.dvb_bbheader_bb(
+            standard=dtv.STANDARD_DVBS2,
+            framesize=dtv.FECFRAME_NORMAL,
+            rate=code_rate,
+            rolloff=rolloff
+        )
+
+        self.bbscrambler = dtv.dvb_bbscrambler_bb(
+            standard=dtv.STANDARD_DVBS2,
+            framesize=dtv.FECFRAME_NORMAL,
+            rate=code_rate
+        )
+
+        self.bch = dtv.dvb_bch_bb(
+            standard=dtv.STANDARD_DVBS2,
+            framesize=dtv.FECFRAME_NORMAL,
+            rate=code_rate
+        )
+
+        self.ldpc = dtv.dvb_ldpc_bb(
+            standard=dtv.STANDARD_DVBS2,
+            framesize=dtv.FECFRAME_NORMAL,
+            rate=code_rate,
+            constellation=constellation
+        )
+
+        self.connect(
+            self,
+            self.bbheader,
+            self.bbscrambler,
+            self.bch,
+            self.ldpc,
+            self
+        )
+
+    def tune_scheduler(self, cores):
+        """Cap each internal edge at two frames and pin each block to the next core"""
+        kbch, nbch = BCH_SIZES[self.code_rate]
+        for block, items in ((self.bbheader, kbch),
+                             (self.bbscrambler, kbch),
+                             (self.bch, nbch),
+                             (self.ldpc, FECFRAME_BITS)):
+            set_buffer_size(block, items)
+            block.set_max_noutput_items(items)
+            block.set_processor_affinity([next(cores)])
+
+
 class DVBS2Transmitter(gr.top_block):
     def __init__(self, args):
         gr.top_block.__init__(self, "DVB-S2 Transmitter")
@@ -70,23 +155,9 @@ class DVBS2Transmitter(gr.top_block):
         # Store configuration
         self.args = args
 
-        # Map modcod string to GNU Radio constants
-        self.modcod_map = {
-            'QPSK1/2': (dtv.MOD_QPSK, dtv.C1_2),
-            'QPSK3/4': (dtv.MOD_QPSK, dtv.C3_4),
-            '8PSK2/3': (dtv.MOD_8PSK, dtv.C2_3),
-            '8PSK5/6': (dtv.MOD_8PSK, dtv.C5_6)
-        }
-
-        # Get modulation and coding from map
-        self.constellation, self.code_rate = self.modcod_map[args.modcod]
-
-        # Map rolloff to GNU Radio constants
-        self.rolloff_map = {
-            0.20: dtv.RO_0_20,
-            0.25: dtv.RO_0_25,
-            0.35: dtv.RO_0_35
-        }
+        # Modulation and coding resolved once in parse_args()
+        self.constellation = args.constellation
+        self.code_rate = args.code_rate
 
         self.setup_blocks()
         self.connect_blocks()
@@ -103,37 +174,17 @@ class DVBS2Transmitter(gr.top_block):
             )
 
             # DVB-S2 Modulation Chain
-            self.bbheader = dtv.dvb_bbheader_bb(
-                standard=dtv.STANDARD_DVBS2,
-                framesize=dtv.FECFRAME_NORMAL,
-                rate=self.code_rate,
-                rolloff=self.rolloff_map[self.args.rolloff]
-            )
-
-            self.bbscrambler = dtv.dvb_bbscrambler_bb(
-                standard=dtv.STANDARD_DVBS2,
-                framesize=dtv.FECFRAME_NORMAL,
-                rate=self.code_rate
-            )
-
-            self.bch = dtv.dvb_bch_bb(
-                standard=dtv.STANDARD_DVBS2,
-                framesize=dtv.FECFRAME_NORMAL,
-                rate=self.code_rate
-            )
-
-            self.ldpc = dtv.dvb_ldpc_bb(
-                standard=dtv.STANDARD_DVBS2,
-                framesize=dtv.FECFRAME_NORMAL,
-                rate=self.code_rate,
-                constellation=self.constellation
+            self.encoder = DVBS2Encoder(
+                code_rate=self.code_rate,
+                constellation=self.constellation,
+                rolloff=ROLLOFF_MAP[self.args.rolloff]
             )
 
             self.modulator = dtv.dvbs2_modulator_bc(
                 framesize=dtv.FECFRAME_NORMAL,
                 rate=self.code_rate,
                 constellation=self.constellation,
-                interpolation=2,
+                interpolation=MODULATOR_INTERPOLATION,
                 goldcode=0
             )
 
@@ -150,10 +201,8 @@ class DVBS2Transmitter(gr.top_block):
             self.sdr_sink = osmosdr.sink(args=sdr_args)
 
             # Configure SDR parameters from CLI args
-            self.sdr_sink.set_sample_rate(self.args.rate)
-            self.sdr_sink.set_center_freq(self.args.freq)
-            self.sdr_sink.set_gain(self.args.gain)
-            self.sdr_sink.set_bandwidth(self.args.rate)
+            configure_sdr(self.sdr_sink, self.args.freq, self.args.rate,
+                          self.args.gain, self.args.rate)
 
             if self.args.debug:
                 print(f"\nSDR Configuration:")
@@ -173,23 +222,49 @@ class DVBS2Transmitter(gr.top_block):
         try:
             self.connect(
                 self.ts_source,
-                self.bbheader,
-                self.bbscrambler,
-                self.bch,
-                self.ldpc,
+                self.encoder,
                 self.modulator,
                 self.physical,
                 self.sdr_sink
             )
+            self.tune_scheduler()
         except Exception as e:
             print(f"Error connecting blocks: {e}")
             sys.exit(1)
 
+    def tune_scheduler(self):
+        """Cap each edge at two frames in its own items and pin blocks to cores"""
+        cores = itertools.cycle(worker_cores())
+
+        ts_bytes = ts_bytes_per_frame(self.code_rate)
+        set_buffer_size(self.ts_source, ts_bytes)
+        self.ts_source.set_max_noutput_items(ts_bytes)
+        self.ts_source.set_processor_affinity([next(cores)])
+
+        self.encoder.tune_scheduler(cores)
+
+        # The modulator's interpolation carries through to the PLFRAME output
+        symbols = fecframe_symbols(self.constellation) * MODULATOR_INTERPOLATION
+        plframe = plframe_symbols(self.constellation, self.args.pilots) * MODULATOR_INTERPOLATION
+        for block, items in ((self.modulator, symbols), (self.physical, plframe)):
+            set_buffer_size(block, items)
+            block.set_max_noutput_items(items)
+            block.set_processor_affinity([next(cores)])
+
+        self.sdr_sink.set_processor_affinity([next(cores)])
+
 
 def start_gstreamer(port):
     """Start GStreamer pipeline for MPEG-TS streaming"""
     gst_cmd = f"gst-launch-1.0 -v udpsrc port={port -1} ! tsparse ! dvbs2enc ! udpsink host=127.0.0.1 port={port}"
-    return subprocess.Popen(gst_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    try:
+        process = subprocess.Popen(shlex.split(gst_cmd), stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL, close_fds=True)
+        return process
+    except OSError as e:
+        print(f"Error starting GStreamer: {e}")
+        return None
 
 def signal_handler(sig, frame):
     print("Terminating DVB-S2 Transmission...")
@@ -216,7 +291,7 @@ if __name__ == "__main__":
 
     try:
         tb = DVBS2Transmitter(args)
-        tb.start()
+        start_flowgraph(tb)
 
         print("Transmission started. Press Enter to quit...")
         input()
@@ -224,7 +299,7 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Error during transmission: {e}")
     finally:
-        if 'gst_process' in globals():
+        if gst_process:
             gst_process.terminate()
         if 'tb' in globals():
             tb.stop()